@@ -1,211 +1,278 @@
 from game_message import Character, Position, Item, TeamGameState, GameMap, MoveLeftAction, MoveRightAction, MoveUpAction, MoveDownAction, MoveToAction, GrabAction, DropAction, Action
-from typing import List, Optional, Tuple
+from typing import List, Optional
 import math
+import numpy as np
+from kernels import find_free_tile_near
+from tick_context import TickContext, NEUTRAL_ZONE, TEAM_ZONE, ENEMY_ZONE, ENEMY_CELL_SIZE, item_kind
+
+# Marks a memoized Carrier slot that was not computed yet (None is a valid result)
+_UNSET = object()
 
 class Carrier:
-  def __init__(self, car: Character, game_state: TeamGameState):
+  # Fixed attribute set: slot loads instead of dict lookups in the hot methods
+  __slots__ = (
+    'car_id', 'position', 'alive', 'items', 'hasSpace', 'value', 'carried_item_types',
+    'carrying_radiant', 'carrying_blitzium', '_ctx', 'team_id', 'team_zone', 'map', 'tick',
+    '_zone', '_zone_buf', '_height', '_enemy_cells', 'all_items', '_occupied',
+    '_occupied_buf', '_blitzium', '_blitzium_values', '_blitzium_zones', '_radiants', 'enemies',
+    'allies', '_enemy_xs', '_enemy_ys', '_enemy_grid', '_dist_from_me',
+    '_reachable', '_blitzium_dists', '_blitzium_reachable', '_safest_team_position_memo',
+    '_radiant_in_team_zone_memo', '_enemy_blitzium_memo', '_neutral_blitzium_memo',
+  )
+
+  def __init__(self, car: Character, game_state: TeamGameState, ctx: Optional[TickContext] = None):
+    # Grids and item/enemy lists shared by every character of the tick
+    if ctx is None:
+      ctx = TickContext.for_state(game_state)
+    self._ctx = ctx
+
     self.car_id = car.id
     self.position = car.position
     self.alive = car.alive
     self.items = car.carriedItems
     self.hasSpace = car.numberOfCarriedItems < game_state.constants.maxNumberOfItemsCarriedPerCharacter
-    self.value = sum(item.value for item in car.carriedItems)
-
-    # Store important game state information
-    self.team_id = game_state.currentTeamId
-    self.team_zone = game_state.teamZoneGrid
-    self.map = game_state.map
-    self.tick = game_state.currentTickNumber
-    self.all_items = game_state.items
-    self.enemies = game_state.otherCharacters
-    self.allies = game_state.yourCharacters
+    self.value = ctx.carried_values[car.id]
+    self.carried_item_types = {item.type for item in self.items}
+    carried_kinds = {item_kind(item_type) for item_type in self.carried_item_types}
+    self.carrying_radiant = "radiant" in carried_kinds
+    self.carrying_blitzium = "blitzium" in carried_kinds
+
+    self.team_id = ctx.team_id
+    self.team_zone = ctx.team_zone
+    self.map = ctx.map
+    self.tick = ctx.tick
+    self._zone = ctx.zone
+    self._zone_buf = ctx.zone_buf
+    self._height = ctx.height
+    self._enemy_cells = ctx.enemy_cells
+    self.all_items = ctx.all_items
+    self._occupied = ctx.occupied
+    self._occupied_buf = ctx.occupied_buf
+    self._blitzium = ctx.blitzium
+    self._blitzium_values = ctx.blitzium_values
+    self._blitzium_zones = ctx.blitzium_zones
+    self._radiants = ctx.radiants
+    self.enemies = ctx.enemies
+    self.allies = ctx.allies
+    self._enemy_xs = ctx.enemy_xs
+    self._enemy_ys = ctx.enemy_ys
+    self._enemy_grid = ctx.enemy_grid
+
+    # Walking distance from us to every tile (-1 if unreachable, MoveTo does nothing towards those)
+    self._dist_from_me = ctx.distances_from(self.position.x, self.position.y)
+    self._reachable = self._dist_from_me >= 0
+    self._blitzium_dists = self._dist_from_me[ctx.blitzium_xs, ctx.blitzium_ys]
+    self._blitzium_reachable = self._reachable[ctx.blitzium_xs, ctx.blitzium_ys]
+
+    # Filled on first use by the properties of the same name without _memo
+    self._safest_team_position_memo = _UNSET
+    self._radiant_in_team_zone_memo = _UNSET
+    self._enemy_blitzium_memo = _UNSET
+    self._neutral_blitzium_memo = _UNSET
 
   def get_closest_item(self, items: List[Item]) -> Optional[Item]:
     """Find the closest item from a list of items"""
     if not items:
       return None
 
-    closest_item = min(items, key=lambda item:
-    abs(item.position.x - self.position.x) +
-    abs(item.position.y - self.position.y))
-    return closest_item
+    xs = np.array([item.position.x for item in items], dtype=np.intp)
+    ys = np.array([item.position.y for item in items], dtype=np.intp)
+    closest = self._closest_index(xs, ys)
+    return items[closest] if closest >= 0 else None
+
+  def _closest_index(self, xs: np.ndarray, ys: np.ndarray, mask: Optional[np.ndarray] = None) -> int:
+    """Index of the reachable (and masked) tile closest to us by walking distance, -1 if there is none"""
+    dists = self._dist_from_me[xs, ys]
+    valid = dists >= 0
+    if mask is not None:
+      valid &= mask
+    if not valid.any():
+      return -1
+    # Unreachable or masked out tiles are pushed past any real walking distance
+    return int(np.where(valid, dists, self._dist_from_me.size).argmin())
 
   def is_in_team_zone(self, pos: Position) -> bool:
     """Check if a position is in our team's zone"""
-    return self.team_zone[pos.x][pos.y] == self.team_id
+    return self._zone_buf[pos.x * self._height + pos.y] == TEAM_ZONE
 
   def is_in_enemy_zone(self, pos: Position) -> bool:
     """Check if a position is in enemy zone"""
-    zone = self.team_zone[pos.x][pos.y]
-    return zone != "" and zone != self.team_id
+    return self._zone_buf[pos.x * self._height + pos.y] == ENEMY_ZONE
 
   def is_in_neutral_zone(self, pos: Position) -> bool:
     """Check if a position is in neutral zone"""
-    return self.team_zone[pos.x][pos.y] == ""
+    return self._zone_buf[pos.x * self._height + pos.y] == NEUTRAL_ZONE
 
   def is_safe_position(self, pos: Position) -> bool:
     """Check if a position is safe from enemies"""
     if not self.is_in_enemy_zone(pos):
       return True
 
-    carrying_blitzium = any(item.type.startswith("blitzium_") for item in self.items)
+    # Only enemies in the surrounding buckets can be close enough to matter
+    x, y = pos.x, pos.y
+    cx, cy = x // ENEMY_CELL_SIZE, y // ENEMY_CELL_SIZE
+    enemy_grid = self._enemy_grid
+    close_enemies = [enemy
+                     for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                     for enemy in enemy_grid.get((cx + dx, cy + dy), ())]
 
     # More careful when carrying Blitzium
-    if carrying_blitzium:
-      for enemy in self.enemies:
-        if enemy.alive:
-          enemy_dist = abs(enemy.position.x - pos.x) + abs(enemy.position.y - pos.y)
-          if enemy_dist <= 2:  # Stay further away when carrying Blitzium
-            return False
+    if self.carrying_blitzium:
+      for ex, ey in close_enemies:
+        if abs(ex - x) + abs(ey - y) <= 2:  # Stay further away when carrying Blitzium
+          return False
     else:
       # Count nearby enemies when not carrying Blitzium
-      nearby_enemies = sum(1 for enemy in self.enemies
-                           if enemy.alive and
-                           abs(enemy.position.x - pos.x) +
-                           abs(enemy.position.y - pos.y) <= 1)
+      nearby_enemies = sum(1 for ex, ey in close_enemies
+                           if abs(ex - x) + abs(ey - y) <= 1)
       if nearby_enemies > 1:  # Only avoid if multiple enemies are very close
         return False
     return True
 
   def find_radiant_in_team_zone(self) -> Optional[Item]:
     """Find radiant items in our team zone"""
-    radiant_items = [
-      item for item in self.all_items
-      if (item.type == "radiant_core" or item.type == "radiant_slag") and
-         self.is_in_team_zone(item.position)
-    ]
-    return self.get_closest_item(radiant_items)
+    ctx = self._ctx
+    closest = self._closest_index(ctx.radiant_xs, ctx.radiant_ys, ctx.radiant_zones == TEAM_ZONE)
+    return self._radiants[closest] if closest >= 0 else None
 
   def find_blitzium_in_zone(self, check_enemy: bool = True, check_neutral: bool = True) -> Optional[Item]:
     """Find most valuable blitzium items in specified zones"""
-    valid_items = []
-    for item in self.all_items:
-      if not item.type.startswith("blitzium_"):
-        continue
-      pos = item.position
-      if (check_enemy and self.is_in_enemy_zone(pos)) or \
-              (check_neutral and self.is_in_neutral_zone(pos)):
-        valid_items.append(item)
-
-    if not valid_items:
+    zones = self._blitzium_zones
+    mask = ((check_enemy & (zones == ENEMY_ZONE)) |
+            (check_neutral & (zones == NEUTRAL_ZONE))) & self._blitzium_reachable
+    candidates = np.flatnonzero(mask)
+    if not candidates.size:
       return None
 
-    # Sort by value first, then by distance if values are equal
-    return max(valid_items,
-               key=lambda item: (item.value,
-                                 -abs(item.position.x - self.position.x) -
-                                 abs(item.position.y - self.position.y)))
+    # Value first, then distance if values are equal: walking distances are below width * height
+    # (int64 so value * width * height cannot wrap on big maps)
+    distance_weight = self.map.width * self.map.height
+    scores = (self._blitzium_values[candidates].astype(np.int64) * distance_weight -
+              self._blitzium_dists[candidates])
+    return self._blitzium[candidates[scores.argmax()]]
 
   def find_drop_spot_near(self, target: Position, max_radius: int = 3) -> Optional[Position]:
     """Find a valid spot to drop an item near a target position"""
-    for radius in range(max_radius + 1):
-      for dx in range(-radius, radius + 1):
-        for dy in range(-radius, radius + 1):
-          pos = Position(
-            x=target.x + dx,
-            y=target.y + dy
-          )
-
-          # Check if position is valid and in enemy zone
-          if (0 <= pos.x < self.map.width and
-                  0 <= pos.y < self.map.height and
-                  self.map.tiles[pos.x][pos.y] != "WALL" and
-                  self.is_in_enemy_zone(pos)):
-
-            # Check if position is empty
-            if not any(item.position.x == pos.x and
-                       item.position.y == pos.y
-                       for item in self.all_items):
-              return pos
-    return None
+    x, y = find_free_tile_near(self._zone, ENEMY_ZONE, self._reachable, self._occupied,
+                               target.x, target.y, max_radius)
+    if x < 0:
+      return None
+    return Position(x=int(x), y=int(y))
+
+  def find_radiant_drop_position(self) -> Optional[Position]:
+    """Find the best free enemy tile to unload radiant on: close to us, away from enemies, near the zone edge"""
+    xs, ys = self._enemy_cells
+    free = self._reachable[xs, ys] & ~self._occupied[xs, ys]
+    if not free.any():
+      return None
+    xs, ys = xs[free], ys[free]
+
+    # Alive enemies within Chebyshev distance 2 of each candidate
+    enemy_density = ((np.abs(xs[:, None] - self._enemy_xs[None, :]) <= 2) &
+                     (np.abs(ys[:, None] - self._enemy_ys[None, :]) <= 2)).sum(axis=1)
+
+    # Candidates touching a non-enemy tile
+    zone = self._zone
+    width, height = zone.shape
+    edge = np.zeros(xs.shape, dtype=bool)
+    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+      nx, ny = xs + dx, ys + dy
+      inside = (0 <= nx) & (nx < width) & (0 <= ny) & (ny < height)
+      edge |= inside & (zone[nx.clip(0, width - 1), ny.clip(0, height - 1)] != ENEMY_ZONE)
+
+    score = 3 * edge - self._dist_from_me[xs, ys] - 5 * enemy_density
+    best = score.argmax()
+    return Position(x=int(xs[best]), y=int(ys[best]))
 
   def find_safest_team_position(self) -> Optional[Position]:
     """Find the safest valid position in our territory"""
-    best_pos = None
-    best_score = float('-inf')
-
-    for x in range(self.map.width):
-      for y in range(self.map.height):
-        # Check if position is valid and in our zone
-        pos = Position(x=x, y=y)
-        if (self.team_zone[x][y] == self.team_id and
-                self.map.tiles[x][y] != "WALL" and
-                not any(item.position.x == x and item.position.y == y
-                        for item in self.all_items)):
-
-          # Calculate risk from enemies
-          risk = sum(1 for enemy in self.enemies
-                     if enemy.alive and
-                     abs(enemy.position.x - x) + abs(enemy.position.y - y) <= 3)
-
-          # Count non-team adjacent tiles to measure depth
-          border_count = sum(1
-                             for dx, dy in [(1,0), (-1,0), (0,1), (0,-1)]
-                             if 0 <= x+dx < self.map.width and
-                             0 <= y+dy < self.map.height and
-                             self.team_zone[x+dx][y+dy] != self.team_id)
-
-          # Scoring: prefer low risk and low border count (deeper position)
-          score = -risk - border_count
-
-          if score > best_score:
-            best_score = score
-            best_pos = pos
-
-    return best_pos
+    # Prefer deep positions with few enemies within 3 tiles
+    valid = (self._zone == TEAM_ZONE) & self._reachable & ~self._occupied
+    if not valid.any():
+      return None
+    # Deepest tile first, enemy risk only breaks depth ties (depth is scaled past the largest risk)
+    risk = self._ctx.enemy_risk
+    score = self._ctx.team_depth.astype(np.int64) * (int(risk.max()) + 1) - risk
+    x, y = np.unravel_index(np.where(valid, score, score.min() - 1).argmax(), score.shape)
+    return Position(x=int(x), y=int(y))
+
+  @property
+  def _safest_team_position(self) -> Optional[Position]:
+    """find_safest_team_position, computed once since a Carrier lives for a single tick"""
+    if self._safest_team_position_memo is _UNSET:
+      self._safest_team_position_memo = self.find_safest_team_position()
+    return self._safest_team_position_memo
+
+  @property
+  def _radiant_in_team_zone(self) -> Optional[Item]:
+    """find_radiant_in_team_zone, computed once since a Carrier lives for a single tick"""
+    if self._radiant_in_team_zone_memo is _UNSET:
+      self._radiant_in_team_zone_memo = self.find_radiant_in_team_zone()
+    return self._radiant_in_team_zone_memo
+
+  @property
+  def _enemy_blitzium(self) -> Optional[Item]:
+    """Best blitzium in the enemy zone, both get_action branches look it up"""
+    if self._enemy_blitzium_memo is _UNSET:
+      self._enemy_blitzium_memo = self.find_blitzium_in_zone(check_enemy=True, check_neutral=False)
+    return self._enemy_blitzium_memo
+
+  @property
+  def _neutral_blitzium(self) -> Optional[Item]:
+    """Best blitzium in the neutral zone, both get_action branches look it up"""
+    if self._neutral_blitzium_memo is _UNSET:
+      self._neutral_blitzium_memo = self.find_blitzium_in_zone(check_enemy=False, check_neutral=True)
+    return self._neutral_blitzium_memo
 
   def get_action(self) -> Optional[Action]:
     """Determine the next action for the carrier"""
     if not self.alive:
       return None
 
+    px, py = self.position.x, self.position.y
+    my_zone = self._zone_buf[px * self._height + py]
+
     # If carrying items
     if self.items:
-      carrying_radiant = any(item.type.startswith("radiant_") for item in self.items)
-      carrying_blitzium = any(item.type.startswith("blitzium_") for item in self.items)
-
       # If carrying Blitzium, try to bring it home safely
-      if carrying_blitzium:
-        if self.is_in_team_zone(self.position):
+      if self.carrying_blitzium:
+        if my_zone == TEAM_ZONE:
           # Find deeper position in our territory
-          deeper_pos = self.find_safest_team_position()
-          if deeper_pos and not (self.position.x == deeper_pos.x and
-                                 self.position.y == deeper_pos.y):
+          deeper_pos = self._safest_team_position
+          if deeper_pos and not (px == deeper_pos.x and py == deeper_pos.y):
             return MoveToAction(characterId=self.car_id, position=deeper_pos)
           return DropAction(characterId=self.car_id)
         else:
           # Find safe path home
-          safe_pos = self.find_safest_team_position()
+          safe_pos = self._safest_team_position
           if safe_pos:
             return MoveToAction(characterId=self.car_id, position=safe_pos)
 
       # Look for Blitzium first in enemy zone
-      target_blitzium = self.find_blitzium_in_zone(check_enemy=True, check_neutral=False)
+      target_blitzium = self._enemy_blitzium
 
       # If carrying Radiant and no enemy Blitzium, try dropping it
-      if not target_blitzium and carrying_radiant:
-        if self.is_in_enemy_zone(self.position) and not any(item.position.x == self.position.x and item.position.y == self.position.y for item in self.all_items):
-          return DropAction(characterId=self.car_id)
-        else:
-          # Find a position in enemy territory to drop
-          for x in range(self.map.width):
-            for y in range(self.map.height):
-              pos = Position(x=x, y=y)
-              if (self.is_in_enemy_zone(pos) and
-                      self.map.tiles[pos.x][pos.y] != "WALL" and
-                      not any(item.position.x == pos.x and
-                              item.position.y == pos.y
-                              for item in self.all_items)):
-                return MoveToAction(characterId=self.car_id, position=pos)
+      if not target_blitzium and self.carrying_radiant:
+        drop_pos = None
+        if my_zone == ENEMY_ZONE:
+          if not self._occupied_buf[px * self._height + py]:
+            return DropAction(characterId=self.car_id)
+          # Already in enemy territory, a free tile right next to us will do
+          drop_pos = self.find_drop_spot_near(self.position, max_radius=1)
+
+        # Find a position in enemy territory to drop
+        if not drop_pos:
+          drop_pos = self.find_radiant_drop_position()
+        if drop_pos:
+          return MoveToAction(characterId=self.car_id, position=drop_pos)
 
       # If no enemy Blitzium, check neutral zone
       if not target_blitzium:
-        target_blitzium = self.find_blitzium_in_zone(check_enemy=False, check_neutral=True)
+        target_blitzium = self._neutral_blitzium
 
       # Try to grab found Blitzium
       if target_blitzium:
-        if (self.position.x == target_blitzium.position.x and
-                self.position.y == target_blitzium.position.y):
+        if px == target_blitzium.position.x and py == target_blitzium.position.y:
           return GrabAction(characterId=self.car_id)
         if self.is_safe_position(target_blitzium.position):
           return MoveToAction(characterId=self.car_id, position=target_blitzium.position)
@@ -213,21 +280,16 @@ class Carrier:
     # If we have space for items
     if self.hasSpace:
       # First priority: Get radiant items out of our zone
-      radiant = self.find_radiant_in_team_zone()
+      radiant = self._radiant_in_team_zone
       if radiant:
-        if self.position.x == radiant.position.x and self.position.y == radiant.position.y:
+        if px == radiant.position.x and py == radiant.position.y:
           return GrabAction(characterId=self.car_id)
         return MoveToAction(characterId=self.car_id, position=radiant.position)
 
       # Look for Blitzium opportunities (enemy zone first, then neutral)
-      for check_zones in [(True, False), (False, True)]:  # First enemy, then neutral
-        blitzium = self.find_blitzium_in_zone(
-          check_enemy=check_zones[0],
-          check_neutral=check_zones[1]
-        )
+      for blitzium in (self._enemy_blitzium, self._neutral_blitzium):
         if blitzium and self.is_safe_position(blitzium.position):
-          if self.position.x == blitzium.position.x and \
-                  self.position.y == blitzium.position.y:
+          if px == blitzium.position.x and py == blitzium.position.y:
             return GrabAction(characterId=self.car_id)
           return MoveToAction(characterId=self.car_id, position=blitzium.position)
 
@@ -1,6 +1,16 @@
 from game_message import Character, Position, Item, TeamGameState, GameMap, MoveLeftAction, MoveRightAction, \
   MoveUpAction, MoveDownAction, Action, DropAction
 from typing import List, Optional, Tuple, Dict
+import numpy as np
+from tick_context import TickContext, TEAM_ZONE, TILE_WALL, TILE_TEAM, TILE_TEAM_OPEN, TILE_ITEM, TILE_BORDER
+
+# (dx, dy, action) in the order get_next_move tries them
+MOVES = (
+  (0, 1, MoveDownAction),
+  (0, -1, MoveUpAction),
+  (1, 0, MoveRightAction),
+  (-1, 0, MoveLeftAction),
+)
 
 class Target:
   def __init__(self, enemy: Character, defender_id: str, threat_level: float):
@@ -10,16 +20,25 @@ class Target:
     self.last_seen_pos = enemy.position
 
 class Defender:
-  # Class variable to track targets across all defender instances
+  # Class variable to track targets across all defender instances and ticks: enemy id -> target
   _targets: Dict[str, Target] = {}
+  _targets_ctx: Optional[TickContext] = None
+  # Threat level of each enemy id, shared by every defender of the tick
+  _threat_cache: Dict[str, float] = {}
+  _threat_cache_ctx: Optional[TickContext] = None
+
+  def __init__(self, car: Character, game_state: TeamGameState, ctx: Optional[TickContext] = None):
+    # Grids and item lists shared by every character of the tick
+    if ctx is None:
+      ctx = TickContext.for_state(game_state)
+    self._ctx = ctx
 
-  def __init__(self, car: Character, game_state: TeamGameState):
     self.car_id = car.id
     self.position = car.position
     self.alive = car.alive
     self.items = car.carriedItems
     self.hasSpace = car.numberOfCarriedItems < game_state.constants.maxNumberOfItemsCarriedPerCharacter
-    self.value = sum(item.value for item in car.carriedItems)
+    self.value = ctx.carried_values[car.id]
 
     # Store important game state information
     self.team_id = game_state.currentTeamId
@@ -30,23 +49,40 @@ class Defender:
     self.allies = game_state.yourCharacters
     self.all_items = game_state.items
 
-    # Reset targets at start of new tick
-    if any(ally.id == self.allies[0].id for ally in self.allies):
-      self._targets.clear()
-
-    # Initialize current target
-    self.current_target = None
+    # Wall, territory, item and border bits of every tile, tile_flags[x * height + y]
+    self._tile_flags = ctx.tile_flags
+    # find_nearest_border_position results by enemy tile, get_action may ask twice
+    self._border_picks = {}
+    self._width = self.map.width
+    self._height = self.map.height
+
+    # Unlike DefenderV2, which re-ranks and reassigns every tick, assignments here are sticky: a defender
+    # keeps chasing the same enemy across ticks instead of swapping whenever threat levels reshuffle.
+    # Once per tick drop the ones whose defender is gone or whose enemy is no longer a threat
+    if Defender._targets_ctx is not ctx:
+      Defender._targets_ctx = ctx
+      alive_allies = {ally.id for ally in self.allies if ally.alive}
+      Defender._targets = {
+        enemy_id: target for enemy_id, target in Defender._targets.items()
+        if target.defender_id in alive_allies and enemy_id in ctx.alive_enemy_ids and
+        self.calculate_threat_level(ctx.enemies_by_id[enemy_id]) > 0
+      }
+
+    # Resume the target this defender had on the previous ticks, if it is still valid
+    self.current_target = next(
+      (target for target in Defender._targets.values() if target.defender_id == self.car_id), None)
     self.update_target()
 
   def is_valid_position(self, x: int, y: int) -> bool:
     """Check if a position is valid (in bounds and not a wall)"""
-    if not (0 <= x < self.map.width and 0 <= y < self.map.height):
+    height = self._height
+    if not (0 <= x < self._width and 0 <= y < height):
       return False
-    return self.map.tiles[x][y] != "WALL"  # [X][Y] order
+    return not self._tile_flags[x * height + y] & TILE_WALL
 
   def is_in_our_territory(self, position: Position) -> bool:
     """Check if a position is in our territory"""
-    return self.team_zone[position.x][position.y] == self.team_id  # [X][Y] order
+    return bool(self._tile_flags[position.x * self._height + position.y] & TILE_TEAM)
 
   @staticmethod
   def manhattan_distance(pos1: Position, pos2: Position) -> int:
@@ -58,107 +94,93 @@ class Defender:
     if not enemy.alive:
       return 0.0
 
-    threat = 100.0  # Base threat level for any enemy
+    # Every enemy is scored at once when a new tick's context shows up
+    if Defender._threat_cache_ctx is not self._ctx:
+      Defender._threat_cache = self._compute_threat_levels()
+      Defender._threat_cache_ctx = self._ctx
+    return Defender._threat_cache[enemy.id]
+
+  def _compute_threat_levels(self) -> Dict[str, float]:
+    """Threat level of every enemy of the tick in one vectorized pass, by enemy id"""
+    ctx = self._ctx
+    xs, ys = ctx.enemy_x, ctx.enemy_y
 
-    # Distance to our territory border
-    min_border_dist = float('inf')
-    for x in range(self.map.width):
-      for y in range(self.map.height):
-        if self.is_in_our_territory(Position(x, y)):
-          dist = self.manhattan_distance(enemy.position, Position(x, y))
-          min_border_dist = min(min_border_dist, dist)
+    # Distance to our territory border, read from the per-tick distance field
+    if ctx.team_open.any():
+      min_border_dist = ctx.dist_to_team[xs, ys].astype(np.float64)
+    else:
+      min_border_dist = np.full(xs.shape, np.inf)
 
-    # Higher threat when closer to border
-    distance_factor = max(0.2, 1 - (min_border_dist * 0.1))
-    threat *= distance_factor
+    # Base threat level for any enemy, higher when closer to border
+    threats = 100.0 * np.maximum(0.2, 1 - (min_border_dist * 0.1))
 
-    # Highest priority if already in our territory
-    if self.is_in_our_territory(enemy.position):
-      threat *= 5.0  # Massive threat increase for territory violation
+    # Highest priority if already in our territory: massive threat increase for territory violation
+    threats = np.where(ctx.zone[xs, ys] == TEAM_ZONE, threats * 5.0, threats)
 
-    return threat
+    return dict(zip((enemy.id for enemy in ctx.enemies), threats.tolist()))
 
   def find_nearest_border_position(self, enemy_pos: Position) -> Optional[Position]:
     """Find the nearest border position to intercept an enemy"""
-    best_pos = None
-    min_score = float('inf')
-
-    for x in range(self.map.width):
-      for y in range(self.map.height):
-        pos = Position(x, y)
-
-        if not self.is_in_our_territory(pos):
-          continue
-
-        # Check if it's a border position
-        is_border = any(
-          not self.is_in_our_territory(Position(x + dx, y + dy))
-          for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]
-          if self.is_valid_position(x + dx, y + dy)
-        )
-
-        if not is_border:
-          continue
-
-        # Score based on distances
-        dist_to_enemy = self.manhattan_distance(pos, enemy_pos)
-        dist_to_self = self.manhattan_distance(pos, self.position)
-
-        # We want to be close to enemy but also consider our distance
-        score = dist_to_enemy + (dist_to_self * 0.5)
+    key = (enemy_pos.x, enemy_pos.y)
+    if key in self._border_picks:
+      return self._border_picks[key]
+    ctx = self._ctx
+    border = ctx.team_border_tiles
+    if not border.size:
+      return None
 
-        if score < min_score:
-          min_score = score
-          best_pos = pos
+    # Score based on distances, the ones to the enemy are shared by every defender chasing it
+    dist_to_enemy = ctx.border_distances_from(*key)
+    dist_to_self = ctx.border_distances_from(self.position.x, self.position.y)
 
-    return best_pos
+    # We want to be close to enemy but also consider our distance
+    best = (dist_to_enemy + dist_to_self * 0.5).argmin()
+    pick = self._border_picks[key] = Position(int(border[best, 0]), int(border[best, 1]))
+    return pick
 
   def update_target(self):
     """Update target selection based on threats and coordination"""
     # Remove stale targets
-    self._targets = {
-      enemy_id: target for enemy_id, target in self._targets.items()
-      if any(e.id == enemy_id and e.alive for e in self.enemies)
+    alive_enemies = self._ctx.alive_enemy_ids
+    Defender._targets = {
+      enemy_id: target for enemy_id, target in Defender._targets.items()
+      if enemy_id in alive_enemies
     }
 
     # Check if current target is still valid
     if self.current_target:
       target_id = self.current_target.enemy.id
-      if (target_id in self._targets and
-              self._targets[target_id].defender_id == self.car_id):
+      if (target_id in Defender._targets and
+              Defender._targets[target_id].defender_id == self.car_id):
         # Update existing target
-        enemy = next(e for e in self.enemies if e.id == target_id)
+        enemy = self._ctx.enemies_by_id[target_id]
         self.current_target = Target(
           enemy=enemy,
           defender_id=self.car_id,
           threat_level=self.calculate_threat_level(enemy)
         )
-        self._targets[target_id] = self.current_target
+        Defender._targets[target_id] = self.current_target
         return
 
-    # Find new target
-    available_enemies = [
-      (enemy, self.calculate_threat_level(enemy))
-      for enemy in self.enemies
-      if enemy.alive
-    ]
-
-    # Sort by threat level
-    available_enemies.sort(key=lambda x: x[1], reverse=True)
-
-    # Try to find untargeted threat
-    for enemy, threat in available_enemies:
-      if threat > 0 and (
-              enemy.id not in self._targets or
-              self._targets[enemy.id].defender_id == self.car_id
+    # Find the most threatening untargeted enemy in one pass, ties going to the first one
+    best_enemy = None
+    best_threat = 0
+    for enemy in self._ctx.live_enemies:
+      threat = self.calculate_threat_level(enemy)
+      if threat > best_threat and (
+              enemy.id not in Defender._targets or
+              Defender._targets[enemy.id].defender_id == self.car_id
       ):
-        self.current_target = Target(
-          enemy=enemy,
-          defender_id=self.car_id,
-          threat_level=threat
-        )
-        self._targets[enemy.id] = self.current_target
-        return
+        best_enemy, best_threat = enemy, threat
+
+    if best_enemy is not None:
+      self.current_target = Target(
+        enemy=best_enemy,
+        defender_id=self.car_id,
+        threat_level=best_threat
+      )
+      Defender._targets[best_enemy.id] = self.current_target
+      return
 
     self.current_target = None
 
@@ -167,131 +189,77 @@ class Defender:
     if not target_pos:
       return None
 
-    best_direction = None
+    best_action = None
     min_distance = float('inf')
 
-    moves = [
-      ((0, 1), lambda cid: MoveDownAction(characterId=cid)),
-      ((0, -1), lambda cid: MoveUpAction(characterId=cid)),
-      ((1, 0), lambda cid: MoveRightAction(characterId=cid)),
-      ((-1, 0), lambda cid: MoveLeftAction(characterId=cid))
-    ]
-
-    for (dx, dy), action_creator in moves:
-      new_x = self.position.x + dx
-      new_y = self.position.y + dy
-
-      if not self.is_valid_position(new_x, new_y):
+    sx, sy = self.position.x, self.position.y
+    tx, ty = target_pos.x, target_pos.y
+    width, height = self.map.width, self.map.height
+    tile_flags = self._tile_flags
+    enemy_adjacent_buf = self._ctx.enemy_adjacent_buf
+    # Steps to the target without leaving our territory, shared by defenders heading to the same tile
+    to_target = self._ctx.team_distances_from(tx, ty)
+
+    for dx, dy, action_cls in MOVES:
+      new_x = sx + dx
+      new_y = sy + dy
+      if not (0 <= new_x < width and 0 <= new_y < height):
         continue
 
       # Stay in our territory unless chasing
-      if not self.is_in_our_territory(Position(new_x, new_y)):
+      i = new_x * height + new_y
+      if not tile_flags[i] & TILE_TEAM_OPEN:
         continue
 
-      new_pos = Position(new_x, new_y)
-      new_distance = self.manhattan_distance(new_pos, target_pos)
+      new_distance = int(to_target[new_x, new_y])
+      if new_distance < 0:
+        # No path inside the territory, fall back on straight-line progress behind every real path
+        new_distance = width * height + abs(new_x - tx) + abs(new_y - ty)
 
       # Prefer positions that lead to interception
-      will_intercept = any(
-        self.manhattan_distance(new_pos, e.position) <= 1
-        for e in self.enemies
-        if e.alive
-      )
-      if will_intercept:
+      if enemy_adjacent_buf[i]:
         new_distance -= 2
 
       if new_distance < min_distance:
         min_distance = new_distance
-        best_direction = action_creator
+        best_action = action_cls
 
-    return best_direction(self.car_id) if best_direction else None
+    return best_action(characterId=self.car_id) if best_action else None
 
   def find_patrol_position(self) -> Optional[Position]:
     """Find good position to patrol when no active threats"""
-    best_score = float('-inf')
-    best_pos = None
-
-    for x in range(self.map.width):
-      for y in range(self.map.height):
-        if not self.is_valid_position(x, y):
-          continue
-
-        pos = Position(x, y)
-        if not self.is_in_our_territory(pos):
-          continue
-
-        score = 0
-
-        # Prefer border positions
-        is_border = any(
-          not self.is_in_our_territory(Position(x + dx, y + dy))
-          for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]
-          if self.is_valid_position(x + dx, y + dy)
-        )
-        if is_border:
-          score += 10
-
-        # Consider territory coverage
-        coverage = sum(
-          1 for dx in range(-2, 3)
-          for dy in range(-2, 3)
-          if self.is_valid_position(x + dx, y + dy) and
-          self.is_in_our_territory(Position(x + dx, y + dy))
-        )
-        score += coverage * 0.5
-
-        if score > best_score:
-          best_score = score
-          best_pos = pos
+    ctx = self._ctx
+    if ctx.patrol_score is None:
+      return None
+    # Only the patrollable tiles are rescored, the shared base score is already worked out
+    tiles, base_score = ctx.patrol_tiles
 
-    return best_pos
+    # Then prefer the ones we can actually walk to soon, by the moves get_next_move makes (inside our zone)
+    from_me = ctx.team_distances_from(self.position.x, self.position.y).ravel()[tiles]
+    reachable = from_me >= 0
+    if not reachable.any():
+      return None
+    best = tiles[np.where(reachable, base_score - 0.25 * from_me, -np.inf).argmax()]
+    x, y = divmod(int(best), self.map.height)
+    return Position(x, y)
 
   def is_border_position(self, position: Position) -> bool:
     """Check if a position is on our territory border"""
-    if not self.is_in_our_territory(position):
-      return False
-
-    return any(
-      not self.is_in_our_territory(Position(position.x + dx, position.y + dy))
-      for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]
-      if self.is_valid_position(position.x + dx, position.y + dy)
-    )
+    return bool(self._tile_flags[position.x * self._height + position.y] & TILE_BORDER)
 
   def is_position_empty(self, position: Position) -> bool:
     """Check if a position has no items on it"""
-    return not any(item.position.x == position.x and item.position.y == position.y
-                   for item in self.all_items)
+    return not self._tile_flags[position.x * self._height + position.y] & TILE_ITEM
 
   def find_nearest_drop_position(self) -> Optional[Position]:
     """Find nearest empty enemy territory position to drop items"""
-    best_pos = None
-    min_dist = float('inf')
-
-    # Check border of our territory for drop points
-    for x in range(self.map.width):
-      for y in range(self.map.height):
-        pos = Position(x, y)
-        if self.is_in_our_territory(pos):
-          continue
-
-        # Must be an empty, valid position
-        if not self.is_valid_position(x, y) or not self.is_position_empty(pos):
-          continue
-
-        # Must be adjacent to our territory
-        if not any(
-                self.is_in_our_territory(Position(x + dx, y + dy))
-                for dx, dy in [(0, 1), (0, -1), (1, 0), (-1, 0)]
-                if self.is_valid_position(x + dx, y + dy)
-        ):
-          continue
-
-        dist = self.manhattan_distance(self.position, pos)
-        if dist < min_dist:
-          min_dist = dist
-          best_pos = pos
-
-    return best_pos
+    # Empty tiles just outside our border, found once per tick for every defender
+    tiles = self._ctx.drop_tiles
+    if not len(tiles):
+      return None
+    dists = np.abs(tiles[:, 0] - self.position.x) + np.abs(tiles[:, 1] - self.position.y)
+    best = dists.argmin()
+    return Position(int(tiles[best, 0]), int(tiles[best, 1]))
 
   def is_safe_to_clean_radiant(self) -> bool:
     """Check if it's safe to pick up radiant items"""
@@ -300,31 +268,24 @@ class Defender:
       return False
 
     # Check if any enemies are too close
-    for enemy in self.enemies:
-      if not enemy.alive:
-        continue
-      if self.manhattan_distance(self.position, enemy.position) <= 3:
-        return False
-    return True
+    ctx = self._ctx
+    too_close = np.abs(ctx.enemy_xs - self.position.x) + np.abs(ctx.enemy_ys - self.position.y) <= 3
+    return not too_close.any()
 
   def find_nearby_radiant(self) -> Optional[Tuple[Position, Position]]:
     """Find nearby radiant item and position to drop it in enemy territory"""
     if not self.is_safe_to_clean_radiant():
       return None
 
-    # Find nearest radiant item in our territory
-    best_item_pos = None
-    min_item_dist = float('inf')
-
-    for item in self.all_items:
-      if item.value < 0 and self.is_in_our_territory(item.position):
-        dist = self.manhattan_distance(self.position, item.position)
-        if dist < min_item_dist and dist <= 3:  # Only consider nearby items
-          min_item_dist = dist
-          best_item_pos = item.position
-
-    if not best_item_pos:
+    # Find nearest radiant item in our territory, among the ones filtered once per tick
+    ctx = self._ctx
+    indices = ctx.team_negative_items
+    dists = np.abs(ctx.item_xs[indices] - self.position.x) + np.abs(ctx.item_ys[indices] - self.position.y)
+    if not (dists <= 3).any():  # Only consider nearby items
       return None
+    best = dists.argmin()
+    min_item_dist = int(dists[best])
+    best_item_pos = self.all_items[indices[best]].position
 
     # Find nearest drop position
     drop_pos = self.find_nearest_drop_position()
@@ -332,7 +293,7 @@ class Defender:
       return None
 
     # Only clean if total distance is reasonable
-    total_dist = min_item_dist + self.manhattan_distance(best_item_pos, drop_pos)
+    total_dist = min_item_dist + abs(best_item_pos.x - drop_pos.x) + abs(best_item_pos.y - drop_pos.y)
     if total_dist > 6:  # Don't go too far from patrol
       return None
 
@@ -342,24 +303,26 @@ class Defender:
     """Determine next action based on current situation"""
     # Update targeting
     self.update_target()
+    px, py = self.position.x, self.position.y
 
     if self.current_target:
       enemy = self.current_target.enemy
+      ex, ey = enemy.position.x, enemy.position.y
 
       # If enemy in territory, chase aggressively
       if self.is_in_our_territory(enemy.position):
-        if self.manhattan_distance(self.position, enemy.position) <= 1:
+        if abs(px - ex) + abs(py - ey) <= 1:
           return None  # Already adjacent for kill
         return self.get_next_move(enemy.position)
 
       # If we're at a good border position, consider staying put or cleaning radiant
       if self.is_border_position(self.position):
         # Check if our current position is a good intercept point
-        dist_to_enemy = self.manhattan_distance(self.position, enemy.position)
+        dist_to_enemy = abs(px - ex) + abs(py - ey)
         best_intercept = self.find_nearest_border_position(enemy.position)
 
         if best_intercept:
-          best_dist = self.manhattan_distance(best_intercept, enemy.position)
+          best_dist = abs(best_intercept.x - ex) + abs(best_intercept.y - ey)
           is_good_position = dist_to_enemy <= best_dist + 1
 
           if is_good_position:
@@ -368,7 +331,7 @@ class Defender:
             if cleanup_info:
               item_pos, drop_pos = cleanup_info
               if len(self.items) > 0:  # If carrying item
-                if self.manhattan_distance(self.position, drop_pos) <= 1:
+                if abs(px - drop_pos.x) + abs(py - drop_pos.y) <= 1:
                   return DropAction(characterId=self.car_id)
                 return self.get_next_move(drop_pos)
               return self.get_next_move(item_pos)
@@ -384,7 +347,7 @@ class Defender:
     if cleanup_info:
       item_pos, drop_pos = cleanup_info
       if len(self.items) > 0:  # If carrying item
-        if self.manhattan_distance(self.position, drop_pos) <= 1:
+        if abs(px - drop_pos.x) + abs(py - drop_pos.y) <= 1:
           return DropAction(characterId=self.car_id)
         return self.get_next_move(drop_pos)
       return self.get_next_move(item_pos)
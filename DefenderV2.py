@@ -1,7 +1,8 @@
 from game_message import Character, Position, Item, TeamGameState, GameMap, MoveLeftAction, MoveRightAction, \
   MoveUpAction, MoveDownAction, Action, DropAction
 from typing import List, Optional, Tuple, Dict
-from functools import lru_cache
+import numpy as np
+from tick_context import TickContext, TEAM_ZONE, TILE_WALL, TILE_TEAM, TILE_TEAM_OPEN, TILE_ITEM, TILE_BORDER
 
 class Target:
   __slots__ = ['enemy', 'defender_id', 'threat_level', 'last_seen_pos']
@@ -14,22 +15,35 @@ class Target:
 
 class Defender:
   _targets: Dict[str, Target] = {}
+  # Context the targets were last reset for
+  _targets_ctx: Optional[TickContext] = None
+  # Threat level by enemy id, for the context it was computed from
+  _threat_cache: Dict[str, float] = {}
+  _threat_cache_ctx: Optional[TickContext] = None
+  # Alive enemies worth chasing, most threatening first, for the context it was ranked from
+  _ranking: List[Tuple[Character, float]] = []
+  _ranking_ctx: Optional[TickContext] = None
   _DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
   _MOVE_ACTIONS = {
-    (0, 1): lambda cid: MoveDownAction(characterId=cid),
-    (0, -1): lambda cid: MoveUpAction(characterId=cid),
-    (1, 0): lambda cid: MoveRightAction(characterId=cid),
-    (-1, 0): lambda cid: MoveLeftAction(characterId=cid)
+    (0, 1): MoveDownAction,
+    (0, -1): MoveUpAction,
+    (1, 0): MoveRightAction,
+    (-1, 0): MoveLeftAction
   }
 
-  def __init__(self, car: Character, game_state: TeamGameState):
+  def __init__(self, car: Character, game_state: TeamGameState, ctx: Optional[TickContext] = None):
+    # State shared by every character of the tick
+    if ctx is None:
+      ctx = TickContext.for_state(game_state)
+    self._ctx = ctx
+
     # Cache frequently accessed values
     self.car_id = car.id
     self.position = car.position
     self.alive = car.alive
     self.items = car.carriedItems
     self.hasSpace = car.numberOfCarriedItems < game_state.constants.maxNumberOfItemsCarriedPerCharacter
-    self.value = sum(item.value for item in self.items)
+    self.value = ctx.carried_values[car.id]
 
     # Cache game state
     self.team_id = game_state.currentTeamId
@@ -43,34 +57,27 @@ class Defender:
     self.width = self.map.width
     self.height = self.map.height
 
-    # Pre-compute valid positions matrix
-    self._valid_positions = self._precompute_valid_positions()
+    # Wall, territory, item and border bits of every tile, tile_flags[x * height + y], shared with the other characters
+    self._tile_flags = ctx.tile_flags
 
-    # Reset targets at start of new tick
-    if any(ally.id == self.allies[0].id for ally in self.allies):
-      self._targets.clear()
+    # Reset targets at start of new tick, once for all defenders built from this context: every defender
+    # claims from a fresh ranking each tick (Defender in Defender.py keeps its assignments across ticks instead)
+    if Defender._targets_ctx is not ctx:
+      Defender._targets_ctx = ctx
+      Defender._targets.clear()
 
     self.current_target = None
     self.update_target()
 
-  def _precompute_valid_positions(self) -> List[List[bool]]:
-    """Pre-compute valid positions matrix"""
-    return [[
-      self.map.tiles[x][y] != "WALL"
-      for y in range(self.height)
-    ] for x in range(self.width)]
-
-  @lru_cache(maxsize=1024)
   def is_valid_position(self, x: int, y: int) -> bool:
-    """Check if a position is valid (cached)"""
+    """Check if a position is valid (in bounds and not a wall)"""
     if not (0 <= x < self.width and 0 <= y < self.height):
       return False
-    return self._valid_positions[x][y]
+    return not self._tile_flags[x * self.height + y] & TILE_WALL
 
-  @lru_cache(maxsize=1024)
   def is_in_our_territory(self, x: int, y: int) -> bool:
-    """Check if a position is in our territory (cached)"""
-    return self.team_zone[x][y] == self.team_id
+    """Check if a position is in our territory"""
+    return bool(self._tile_flags[x * self.height + y] & TILE_TEAM)
 
   @staticmethod
   def manhattan_distance(x1: int, y1: int, x2: int, y2: int) -> int:
@@ -82,33 +89,46 @@ class Defender:
     if not enemy.alive:
       return 0.0
 
+    # Every enemy is scored at once by the first defender of the tick
+    if Defender._threat_cache_ctx is not self._ctx:
+      Defender._threat_cache = self._compute_threat_levels()
+      Defender._threat_cache_ctx = self._ctx
+    return Defender._threat_cache[enemy.id]
+
+  def _compute_threat_levels(self) -> Dict[str, float]:
+    """Threat level of every enemy of the tick in one vectorized pass, by enemy id"""
+    ctx = self._ctx
+    xs, ys = ctx.enemy_x, ctx.enemy_y
     threat = 100.0
-    enemy_x, enemy_y = enemy.position.x, enemy.position.y
-
-    # Check if already in territory (highest priority)
-    if self.is_in_our_territory(enemy_x, enemy_y):
-      return threat * 5.0
-
-    # Find minimum border distance efficiently
-    min_border_dist = float('inf')
-    found_territory = False
-
-    # Use dynamic programming approach for border distance
-    for x in range(self.width):
-      for y in range(self.height):
-        if self.is_in_our_territory(x, y):
-          found_territory = True
-          dist = self.manhattan_distance(enemy_x, enemy_y, x, y)
-          if dist < min_border_dist:
-            min_border_dist = dist
-            if min_border_dist <= 2:  # Early exit if very close
-              return threat * 2.0
-
-    if not found_territory:
-      return 0.0
 
-    distance_factor = max(0.2, 1 - (min_border_dist * 0.1))
-    return threat * distance_factor
+    # Distance to our closest tile, from the field shared by every defender this tick
+    min_border_dist = ctx.dist_to_team[xs, ys]
+    distance_factor = np.maximum(0.2, 1 - (min_border_dist * 0.1))
+
+    threats = np.select(
+      [ctx.zone[xs, ys] == TEAM_ZONE,  # Already in territory (highest priority)
+       np.full(xs.shape, not ctx.team_open.any()),
+       min_border_dist <= 2],
+      [threat * 5.0, 0.0, threat * 2.0],
+      threat * distance_factor)
+
+    return dict(zip((enemy.id for enemy in ctx.enemies), threats.tolist()))
+
+  def update_target(self):
+    """Claim the most threatening enemy no other defender has claimed this tick"""
+    # The ranking is worked out once and walked by every defender
+    if Defender._ranking_ctx is not self._ctx:
+      ranking = [(enemy, self.calculate_threat_level(enemy)) for enemy in self._ctx.live_enemies]
+      Defender._ranking = sorted((entry for entry in ranking if entry[1] > 0), key=lambda entry: -entry[1])
+      Defender._ranking_ctx = self._ctx
+
+    for enemy, threat in Defender._ranking:
+      target = Defender._targets.get(enemy.id)
+      if target is None or target.defender_id == self.car_id:
+        self.current_target = Defender._targets[enemy.id] = Target(enemy, self.car_id, threat)
+        return
+
+    self.current_target = None
 
   def get_next_move(self, target_pos: Position) -> Optional[Action]:
     """Optimized pathfinding towards target"""
@@ -120,49 +140,55 @@ class Defender:
 
     best_direction = None
     min_distance = float('inf')
+    width, height = self.width, self.height
+    tile_flags = self._tile_flags
+    enemy_adjacent_buf = self._ctx.enemy_adjacent_buf
 
     # Check all possible moves
     for dx, dy in self._DIRECTIONS:
       new_x, new_y = current_x + dx, current_y + dy
 
-      if not self.is_valid_position(new_x, new_y):
+      # In bounds, in our territory and not a wall
+      if not (0 <= new_x < width and 0 <= new_y < height):
         continue
-
-      if not self.is_in_our_territory(new_x, new_y):
+      i = new_x * height + new_y
+      if not tile_flags[i] & TILE_TEAM_OPEN:
         continue
 
-      new_distance = self.manhattan_distance(new_x, new_y, target_x, target_y)
+      new_distance = abs(new_x - target_x) + abs(new_y - target_y)
 
       # Quick interception check
-      for enemy in self.enemies:
-        if enemy.alive and self.manhattan_distance(new_x, new_y, enemy.position.x, enemy.position.y) <= 1:
-          new_distance -= 2
-          break
+      if enemy_adjacent_buf[i]:
+        new_distance -= 2
 
       if new_distance < min_distance:
         min_distance = new_distance
         best_direction = (dx, dy)
 
-    return self._MOVE_ACTIONS[best_direction](self.car_id) if best_direction else None
+    return self._MOVE_ACTIONS[best_direction](characterId=self.car_id) if best_direction else None
 
   def get_action(self) -> Optional[Action]:
     """Optimized main action decision logic"""
     self.update_target()
 
+    # Our own tile, read once as ints for every check below
+    px, py = self.position.x, self.position.y
+    on_border = self._is_good_border_tile(px, py)
+
     if self.current_target:
-      enemy = self.current_target.enemy
-      enemy_pos = enemy.position
+      enemy_pos = self.current_target.enemy.position
+      ex, ey = enemy_pos.x, enemy_pos.y
 
       # Quick adjacency check for kill
-      if self.manhattan_distance(self.position.x, self.position.y, enemy_pos.x, enemy_pos.y) <= 1:
+      if abs(px - ex) + abs(py - ey) <= 1:
         return None
 
       # Handle enemy in territory
-      if self.is_in_our_territory(enemy_pos.x, enemy_pos.y):
+      if self.is_in_our_territory(ex, ey):
         return self.get_next_move(enemy_pos)
 
       # Efficient border position handling
-      if self._is_good_border_position(self.position):
+      if on_border:
         cleanup_action = self._handle_cleanup()
         if cleanup_action:
           return cleanup_action
@@ -178,100 +204,52 @@ class Defender:
     if cleanup_action:
       return cleanup_action
 
-    if not self._is_good_border_position(self.position):
+    if not on_border:
       return self.get_next_move(self._find_efficient_patrol_position())
 
     return None
 
-  def _is_good_border_position(self, pos: Position) -> bool:
-    """Efficient border position check"""
-    if not self.is_in_our_territory(pos.x, pos.y):
-      return False
-
-    return any(
-      not self.is_in_our_territory(pos.x + dx, pos.y + dy)
-      for dx, dy in self._DIRECTIONS
-      if self.is_valid_position(pos.x + dx, pos.y + dy)
-    )
+  def _is_good_border_tile(self, x: int, y: int) -> bool:
+    """Efficient border position check on bare coordinates, so callers don't build a Position"""
+    # Our tiles next to an open tile outside, found once per tick for every defender
+    return bool(self._tile_flags[x * self.height + y] & TILE_BORDER)
 
   def _find_efficient_intercept(self, enemy_pos: Position) -> Optional[Position]:
     """Find efficient interception position using gradient descent"""
     current_x, current_y = self.position.x, self.position.y
+    enemy_x, enemy_y = enemy_pos.x, enemy_pos.y
+    best = None
+    best_score = float('inf')
+    width, height = self.width, self.height
+    tile_flags = self._tile_flags
 
-    # Start from current position and move towards border
-    for _ in range(5):  # Limit iterations
-      best_pos = None
-      best_score = float('inf')
-
-      for dx, dy in self._DIRECTIONS:
-        new_x, new_y = current_x + dx, current_y + dy
-
-        if not self.is_valid_position(new_x, new_y):
-          continue
-
-        if not self._is_good_border_position(Position(new_x, new_y)):
-          continue
+    # Step onto the neighbouring border tile closest to the enemy
+    for dx, dy in self._DIRECTIONS:
+      new_x, new_y = current_x + dx, current_y + dy
 
-        score = self.manhattan_distance(new_x, new_y, enemy_pos.x, enemy_pos.y)
+      if not (0 <= new_x < width and 0 <= new_y < height):
+        continue
+      flags = tile_flags[new_x * height + new_y]
+      if flags & (TILE_TEAM_OPEN | TILE_BORDER) != TILE_TEAM_OPEN | TILE_BORDER:
+        continue
 
-        if score < best_score:
-          best_score = score
-          best_pos = Position(new_x, new_y)
+      score = abs(new_x - enemy_x) + abs(new_y - enemy_y)
 
-      if best_pos:
-        return best_pos
+      if score < best_score:
+        best_score = score
+        best = (new_x, new_y)
 
-    return None
+    return Position(*best) if best else None
 
   def is_position_empty(self, x: int, y: int) -> bool:
     """Check if a position has no items on it"""
-    return not any(
-      item.position.x == x and item.position.y == y
-      for item in self.all_items
-    )
+    return not self._tile_flags[x * self.height + y] & TILE_ITEM
 
   def _find_efficient_drop_position(self) -> Optional[Position]:
     """Find nearest valid empty position to drop items in enemy territory"""
-    current_x, current_y = self.position.x, self.position.y
-    best_pos = None
-    min_dist = float('inf')
-
-    # Search in expanding radius
-    for radius in range(1, 6):  # Limit search radius
-      for dx in range(-radius, radius + 1):
-        for dy in range(-radius, radius + 1):
-          x, y = current_x + dx, current_y + dy
-
-          if not self.is_valid_position(x, y):
-            continue
-
-          # Must be in enemy territory - NEVER drop in our territory
-          if self.is_in_our_territory(x, y):
-            continue
-
-          # Must be empty
-          if not self.is_position_empty(x, y):
-            continue
-
-          # Should be adjacent to our territory for safe drops
-          has_our_territory = any(
-            self.is_in_our_territory(x + tdx, y + tdy)
-            for tdx, tdy in self._DIRECTIONS
-            if self.is_valid_position(x + tdx, y + tdy)
-          )
-
-          if not has_our_territory:
-            continue
-
-          dist = self.manhattan_distance(current_x, current_y, x, y)
-          if dist < min_dist:
-            min_dist = dist
-            best_pos = Position(x, y)
-
-      if best_pos:  # Found a valid position in current radius
-        break
-
-    return best_pos
+    # Empty tiles outside our zone next to it (never in our territory), found once per tick; limit search radius
+    best = self._nearest_in_squares(self._ctx.drop_tiles, 5)
+    return Position(*best) if best else None
 
   def _handle_cleanup(self) -> Optional[Action]:
     """Optimized cleanup handling with position validation"""
@@ -279,7 +257,7 @@ class Defender:
       drop_pos = self._find_efficient_drop_position()
       if drop_pos:
         # Double check all conditions before dropping
-        if (self.manhattan_distance(self.position.x, self.position.y, drop_pos.x, drop_pos.y) <= 1 and
+        if (abs(self.position.x - drop_pos.x) + abs(self.position.y - drop_pos.y) <= 1 and
                 self.is_position_empty(drop_pos.x, drop_pos.y) and
                 not self.is_in_our_territory(drop_pos.x, drop_pos.y)):  # Extra safety check
           return DropAction(characterId=self.car_id)
@@ -287,34 +265,21 @@ class Defender:
 
     return None
 
-  @lru_cache(maxsize=128)
   def _find_efficient_patrol_position(self) -> Optional[Position]:
     """Find efficient patrol position using territory coverage"""
-    current_x, current_y = self.position.x, self.position.y
+    best = self._nearest_in_squares(self._ctx.open_border_tiles, 3)
+    return Position(*best) if best else Position(self.position.x, self.position.y)
 
-    best_pos = None
-    best_score = -1
-
-    # Search in expanding radius
-    for radius in range(1, 4):
-      for dx in range(-radius, radius + 1):
-        for dy in range(-radius, radius + 1):
-          x, y = current_x + dx, current_y + dy
-
-          if not self.is_valid_position(x, y):
-            continue
-
-          if not self.is_in_our_territory(x, y):
-            continue
-
-          if self._is_good_border_position(Position(x, y)):
-            score = 10 - self.manhattan_distance(current_x, current_y, x, y)
-
-            if score > best_score:
-              best_score = score
-              best_pos = Position(x, y)
-
-      if best_pos:
-        return best_pos
-
-    return Position(current_x, current_y)
\ No newline at end of file
+  def _nearest_in_squares(self, tiles: np.ndarray, max_radius: int) -> Optional[Tuple[int, int]]:
+    """Closest of the (x, y) rows within the first square of radius 1 to max_radius around us holding any"""
+    if not len(tiles):
+      return None
+    dx = np.abs(tiles[:, 0] - self.position.x)
+    dy = np.abs(tiles[:, 1] - self.position.y)
+    radius = np.maximum(np.maximum(dx, dy), 1)
+    nearest = radius.min()
+    if nearest > max_radius:
+      return None
+    # Ties go to the first tile in x-major order, like a square scan
+    best = np.argmin(np.where(radius <= nearest, dx + dy, np.iinfo(np.intp).max))
+    return int(tiles[best, 0]), int(tiles[best, 1])
@@ -11,7 +11,6 @@ class MyBot(Bot):
         Here is where the magic happens, for now the moves are not very good. I bet you can do better ;)
         """
         actions = []
-        game_message.print()
         for character in game_message.yourCharacters:
             actions.append(
                 random.choice(
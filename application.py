@@ -59,8 +59,6 @@ async def game_loop(websocket: websockets.WebSocketServerProtocol, bot: Bot):
             "actions": [dataclasses.asdict(action) for action in actions],
         }
 
-        print(json.dumps(payload))
-
         await websocket.send(json.dumps(payload))
 
 
@@ -2,6 +2,8 @@ from collections import defaultdict
 from numbers import Number
 from functools import partial
 from heapq import heappush, heappop
+import numpy as np
+from kernels import astar_grid
 
 def d_manhattan(a: tuple[Number, ...], b: tuple[Number, ...]) -> Number:
     return sum([abs(pair[0] - pair[1]) for pair in zip(a, b)])
@@ -32,24 +34,47 @@ def A_star(start, goal, neighbors, d, h) -> list[tuple[Number, Number]] | None:
     open_set = []
     heappush(open_set, (f_score[start], start))
     while open_set:
-        _, current = heappop(open_set)
+        f, current = heappop(open_set)
 
         if current == goal:
             return reconstruct_path(came_from, current)
-        
+
+        # Stale entry: the node was pushed again with a better score since
+        if f > f_score[current]:
+            continue
+
         for node in neighbors(current):
             tentative_g_score = g_score[current] + d(current, node)
             if tentative_g_score < g_score[node]:
                 came_from[node] = current
                 g_score[node] = tentative_g_score
                 f_score[node] = tentative_g_score + h(node)
+                heappush(open_set, (f_score[node], node))
 
-                if node not in open_set:
-                    heappush(open_set, (f_score[node], node))
-    
 
 djikstra = partial(A_star, h=lambda _: 0)
 
 def A_star_classic(start, goal, neighbors, d) -> list[tuple[Number, Number]] | None:
     h = partial(d_manhattan, goal)
-    return A_star(start, goal, neighbors, d, h)
\ No newline at end of file
+    return A_star(start, goal, neighbors, d, h)
+
+# g_score, came_from, heap and stamp arrays of A_star_grid by map size, allocated once and reused by every call
+_astar_scratch: dict[int, tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+# Bumped on every call, so scores stamped by earlier calls read as unset without clearing the arrays
+_astar_generation = 0
+
+def A_star_grid(start: tuple[int, int], goal: tuple[int, int], map: list[list[bool]]) -> list[tuple[int, int]] | None:
+    """A_star_classic with neighbors_one_move_udlr and d_manhattan, compiled for walkable grids indexed [x][y]"""
+    global _astar_generation
+    walkable = np.ascontiguousarray(map, dtype=bool)
+    size = walkable.size
+    scratch = _astar_scratch.get(size)
+    if scratch is None:
+        scratch = _astar_scratch[size] = (np.empty(size, dtype=np.int64), np.empty(size, dtype=np.int64),
+                                          np.empty(4 * size + 1, dtype=np.int64), np.zeros(size, dtype=np.int64))
+    _astar_generation += 1
+    path = astar_grid(walkable, start[0], start[1], goal[0], goal[1], *scratch, _astar_generation)
+    if not len(path):
+        return None
+    height = walkable.shape[1]
+    return [divmod(node, height) for node in path.tolist()]
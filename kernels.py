@@ -0,0 +1,191 @@
+import numpy as np
+from numba import njit
+
+# Grids are indexed [x, y] like teamZoneGrid and map.tiles
+
+
+@njit(cache=True)
+def border_depth(zone, own_code):
+    """Manhattan distance from every tile to the closest tile whose zone is not own_code (multi-source BFS)"""
+    width, height = zone.shape
+    unreached = width + height
+    depth = np.full((width, height), unreached, dtype=np.int32)
+    queue_x = np.empty(width * height, dtype=np.int32)
+    queue_y = np.empty(width * height, dtype=np.int32)
+    head = 0
+    tail = 0
+    for x in range(width):
+        for y in range(height):
+            if zone[x, y] != own_code:
+                depth[x, y] = 0
+                queue_x[tail] = x
+                queue_y[tail] = y
+                tail += 1
+
+    while head < tail:
+        x = queue_x[head]
+        y = queue_y[head]
+        head += 1
+        next_depth = depth[x, y] + 1
+        for i in range(4):
+            nx = x + (1, -1, 0, 0)[i]
+            ny = y + (0, 0, 1, -1)[i]
+            if 0 <= nx < width and 0 <= ny < height and depth[nx, ny] > next_depth:
+                depth[nx, ny] = next_depth
+                queue_x[tail] = nx
+                queue_y[tail] = ny
+                tail += 1
+    return depth
+
+
+@njit(cache=True)
+def bfs_distances(walls, sx, sy, queue):
+    """Walking distance from (sx, sy) to every tile, -1 where it cannot be reached"""
+    # queue is caller-owned scratch of width * height ints holding flat x * height + y tiles
+    width, height = walls.shape
+    dist = np.full((width, height), -1, dtype=np.int32)
+    dist[sx, sy] = 0
+    queue[0] = sx * height + sy
+    head = 0
+    tail = 1
+    while head < tail:
+        x, y = divmod(queue[head], height)
+        head += 1
+        next_dist = dist[x, y] + 1
+        for i in range(4):
+            nx = x + (1, -1, 0, 0)[i]
+            ny = y + (0, 0, 1, -1)[i]
+            if 0 <= nx < width and 0 <= ny < height and not walls[nx, ny] and dist[nx, ny] < 0:
+                dist[nx, ny] = next_dist
+                queue[tail] = nx * height + ny
+                tail += 1
+    return dist
+
+
+@njit(cache=True)
+def find_free_tile_near(zone, zone_code, reachable, occupied, tx, ty, max_radius):
+    """First reachable, empty zone_code tile in growing rings around (tx, ty), (-1, -1) if there is none"""
+    width, height = zone.shape
+    for radius in range(max_radius + 1):
+        # Only the ring at exactly this radius, the inner ones were already checked
+        for dx in range(-radius, radius + 1):
+            dy_step = 1 if dx == -radius or dx == radius else max(2 * radius, 1)
+            for dy in range(-radius, radius + 1, dy_step):
+                x = tx + dx
+                y = ty + dy
+                if (0 <= x < width and 0 <= y < height and reachable[x, y] and
+                        zone[x, y] == zone_code and not occupied[x, y]):
+                    return x, y
+    return -1, -1
+
+
+@njit(cache=True)
+def team_layout(zone, walls, own_code):
+    """Border mask of the own_code zone and, for every tile, its open own_code tiles in the 5x5 square around it"""
+    width, height = zone.shape
+    border = np.zeros((width, height), dtype=np.bool_)
+    coverage = np.zeros((width, height), dtype=np.int32)
+    for x in range(width):
+        for y in range(height):
+            if zone[x, y] != own_code:
+                continue
+            # Border: an open neighbour outside the zone
+            for i in range(4):
+                nx = x + (1, -1, 0, 0)[i]
+                ny = y + (0, 0, 1, -1)[i]
+                if 0 <= nx < width and 0 <= ny < height and not walls[nx, ny] and zone[nx, ny] != own_code:
+                    border[x, y] = True
+                    break
+            # An open tile of the zone counts towards every tile within 2 on both axes
+            if not walls[x, y]:
+                for cx in range(max(x - 2, 0), min(x + 3, width)):
+                    for cy in range(max(y - 2, 0), min(y + 3, height)):
+                        coverage[cx, cy] += 1
+    return border, coverage
+
+
+@njit(cache=True)
+def astar_grid(walkable, sx, sy, gx, gy, g_score, came_from, heap, stamp, generation):
+    """A* over the walkable tiles with up/down/left/right moves, flat x * height + y path from start to goal, empty if none
+
+    g_score, came_from and stamp (width * height) and heap (4 * width * height + 1) are caller-owned int64 scratch, reused
+    across calls; g_score[node] only counts when stamp[node] == generation, so each call passes a generation never used before
+    """
+    width, height = walkable.shape
+    size = width * height
+    open_tiles = walkable.ravel()
+    goal = gx * height + gy
+    # heap is a binary min-heap of f * size + node, so ties pop in (x, y) order like heapq on (f, (x, y)) tuples
+    start = sx * height + sy
+    g_score[start] = 0
+    came_from[start] = -1
+    stamp[start] = generation
+    heap[0] = (abs(sx - gx) + abs(sy - gy)) * size + start
+    heap_len = 1
+
+    while heap_len:
+        top = heap[0]
+        heap_len -= 1
+        last = heap[heap_len]
+        # Sift the last entry down from the root
+        i = 0
+        while True:
+            child = 2 * i + 1
+            if child >= heap_len:
+                break
+            if child + 1 < heap_len and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[child] >= last:
+                break
+            heap[i] = heap[child]
+            i = child
+        if heap_len:
+            heap[i] = last
+
+        current = top % size
+        x, y = divmod(current, height)
+        # Stale entry, the node was pushed again with a better score
+        if top // size > g_score[current] + abs(x - gx) + abs(y - gy):
+            continue
+
+        if current == goal:
+            length = 1
+            node = current
+            while came_from[node] >= 0:
+                node = came_from[node]
+                length += 1
+            path = np.empty(length, dtype=np.int64)
+            node = current
+            for k in range(length - 1, -1, -1):
+                path[k] = node
+                node = came_from[node]
+            return path
+
+        tentative = g_score[current] + 1
+        for k in range(4):
+            nx = x + (0, 0, -1, 1)[k]
+            ny = y + (-1, 1, 0, 0)[k]
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            # Neighbours are a fixed offset away in the flat layout
+            node = current + (-1, 1, -height, height)[k]
+            if not open_tiles[node]:
+                continue
+            if stamp[node] == generation and tentative >= g_score[node]:
+                continue
+            came_from[node] = current
+            g_score[node] = tentative
+            stamp[node] = generation
+            # Sift the new entry up from the end
+            entry = (tentative + abs(nx - gx) + abs(ny - gy)) * size + node
+            i = heap_len
+            heap_len += 1
+            while i:
+                parent = (i - 1) // 2
+                if heap[parent] <= entry:
+                    break
+                heap[i] = heap[parent]
+                i = parent
+            heap[i] = entry
+
+    return np.empty(0, dtype=np.int64)
@@ -1,6 +1,7 @@
 import random
 from game_message import *
-from collections import deque
+import numpy as np
+from tick_context import TickContext
 
 class Bot:
     def __init__(self):
@@ -12,18 +13,30 @@ class Bot:
         """
         actions = []
 
-        blitzium = deque()
-        radiant = deque()
-        for item in game_message.items:
-            if item.type.startswith("blitzium"):
-                blitzium.append(item)
-            else:
-                radiant.append(item)
-
-
-        for character in game_message.yourCharacters:
-
-            item_to_grab = blitzium.pop()
+        # Items are classified once per tick in the shared context, in game_message.items order
+        ctx = TickContext.for_state(game_message)
+        characters = game_message.yourCharacters
+        if not characters or not len(ctx.blitzium):
+            return actions
+
+        # Distance from every character to every blitzium, rows by character
+        char_xs = np.array([character.position.x for character in characters])
+        char_ys = np.array([character.position.y for character in characters])
+        dists = np.abs(char_xs[:, None] - ctx.blitzium_xs[None, :]) + np.abs(char_ys[:, None] - ctx.blitzium_ys[None, :])
+        taken = np.iinfo(dists.dtype).max
+
+        # Closest character/blitzium pair overall first, so nobody is sent across the map for an item a teammate is next to
+        assigned = {}
+        for _ in range(min(dists.shape)):
+            row, closest = divmod(int(dists.argmin()), dists.shape[1])
+            dists[row, :] = taken
+            dists[:, closest] = taken
+            assigned[row] = ctx.blitzium[closest]
+
+        for row, character in enumerate(characters):
+            item_to_grab = assigned.get(row)
+            if item_to_grab is None:
+                continue
 
             if character.position == item_to_grab.position:
                 actions.append(GrabAction(characterId=character.id))
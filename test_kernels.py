@@ -0,0 +1,141 @@
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+from astar import A_star_classic, A_star_grid, d_manhattan, neighbors_one_move_udlr
+from kernels import astar_grid, bfs_distances, border_depth, find_free_tile_near, team_layout
+
+SEEDS = range(12)
+MOVES = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def random_grids(seed):
+    """(walls, zone) indexed [x, y]: about a fifth walls, zone codes 0 / 1 / 2"""
+    r = random.Random(seed)
+    width, height = r.randint(3, 14), r.randint(3, 14)
+    walls = np.array([[r.random() < 0.2 for _ in range(height)] for _ in range(width)], dtype=bool)
+    zone = np.array([[r.choice((0, 1, 1, 2)) for _ in range(height)] for _ in range(width)], dtype=np.int8)
+    return walls, zone
+
+
+def reference_bfs(walls, sx, sy):
+    width, height = walls.shape
+    dist = np.full((width, height), -1, dtype=np.int32)
+    dist[sx, sy] = 0
+    frontier = [(sx, sy)]
+    while frontier:
+        next_frontier = []
+        for x, y in frontier:
+            for dx, dy in MOVES:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height and not walls[nx, ny] and dist[nx, ny] < 0:
+                    dist[nx, ny] = dist[x, y] + 1
+                    next_frontier.append((nx, ny))
+        frontier = next_frontier
+    return dist
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_border_depth_is_distance_to_the_closest_other_zone_tile(seed):
+    _, zone = random_grids(seed)
+    width, height = zone.shape
+    others = [(x, y) for x in range(width) for y in range(height) if zone[x, y] != 1]
+    expected = np.array([[min((abs(x - ox) + abs(y - oy) for ox, oy in others), default=width + height)
+                          for y in range(height)] for x in range(width)])
+    np.testing.assert_array_equal(border_depth(zone, 1), expected)
+
+
+def test_border_depth_without_other_zone_tiles():
+    zone = np.ones((4, 3), dtype=np.int8)
+    np.testing.assert_array_equal(border_depth(zone, 1), np.full((4, 3), 7))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_bfs_distances_matches_reference(seed):
+    walls, _ = random_grids(seed)
+    queue = np.empty(walls.size, dtype=np.int32)
+    for sx in range(walls.shape[0]):
+        for sy in range(walls.shape[1]):
+            np.testing.assert_array_equal(bfs_distances(walls, sx, sy, queue), reference_bfs(walls, sx, sy))
+
+
+def test_bfs_distances_marks_walled_off_tiles_unreachable():
+    walls = np.zeros((5, 5), dtype=bool)
+    walls[2, :] = True
+    dist = bfs_distances(walls, 0, 0, np.empty(walls.size, dtype=np.int32))
+    assert (dist[3:, :] == -1).all()
+    assert (dist[2, :] == -1).all()
+    assert dist[1, 4] == 5
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_find_free_tile_near_returns_the_first_tile_of_the_ring_scan(seed):
+    walls, zone = random_grids(seed)
+    r = random.Random(seed)
+    width, height = zone.shape
+    reachable = reference_bfs(walls, 0, 0) >= 0
+    occupied = np.array([[r.random() < 0.3 for _ in range(height)] for _ in range(width)], dtype=bool)
+    for tx in range(width):
+        for ty in range(height):
+            expected = next(((tx + dx, ty + dy)
+                             for radius in range(4)
+                             for dx in range(-radius, radius + 1)
+                             for dy in range(-radius, radius + 1)
+                             if max(abs(dx), abs(dy)) == radius and
+                             0 <= tx + dx < width and 0 <= ty + dy < height and
+                             reachable[tx + dx, ty + dy] and zone[tx + dx, ty + dy] == 2 and
+                             not occupied[tx + dx, ty + dy]), (-1, -1))
+            assert find_free_tile_near(zone, 2, reachable, occupied, tx, ty, 3) == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_team_layout_matches_reference(seed):
+    walls, zone = random_grids(seed)
+    width, height = zone.shape
+    inside = lambda x, y: 0 <= x < width and 0 <= y < height
+    expected_border = np.array([[zone[x, y] == 1 and any(inside(x + dx, y + dy) and not walls[x + dx, y + dy] and
+                                                         zone[x + dx, y + dy] != 1 for dx, dy in MOVES)
+                                 for y in range(height)] for x in range(width)])
+    expected_coverage = np.array([[sum(1 for cx in range(x - 2, x + 3) for cy in range(y - 2, y + 3)
+                                       if inside(cx, cy) and zone[cx, cy] == 1 and not walls[cx, cy])
+                                   for y in range(height)] for x in range(width)])
+    border, coverage = team_layout(zone, walls, 1)
+    np.testing.assert_array_equal(border, expected_border)
+    np.testing.assert_array_equal(coverage, expected_coverage)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_a_star_grid_matches_the_generic_a_star(seed):
+    walls, _ = random_grids(seed)
+    walkable = ~walls
+    # Walled border, like the game maps, so the generic neighbours never index out of the grid
+    walkable[0, :] = walkable[-1, :] = walkable[:, 0] = walkable[:, -1] = False
+    free = [tuple(tile) for tile in np.argwhere(walkable).tolist()]
+    if len(free) < 2:
+        pytest.skip("no room for a path")
+    grid = walkable.tolist()
+    r = random.Random(seed)
+    for _ in range(20):
+        start, goal = r.choice(free), r.choice(free)
+        expected = A_star_classic(start, goal, partial(neighbors_one_move_udlr, map=grid), d_manhattan)
+        assert A_star_grid(start, goal, grid) == expected
+        if expected is not None:
+            assert len(expected) - 1 == reference_bfs(~walkable, *start)[goal]
+
+
+def test_astar_grid_reuses_stamped_scratch_across_calls():
+    walkable = np.ones((6, 5), dtype=bool)
+    walkable[3, :4] = False
+    size = walkable.size
+    scratch = (np.empty(size, dtype=np.int64), np.empty(size, dtype=np.int64),
+               np.empty(4 * size + 1, dtype=np.int64), np.zeros(size, dtype=np.int64))
+    first = astar_grid(walkable, 0, 0, 5, 0, *scratch, 1)
+    # Scores left over from the first call must read as unset under a new generation
+    again = astar_grid(walkable, 0, 0, 5, 0, *scratch, 2)
+    np.testing.assert_array_equal(first, again)
+    assert len(first) - 1 == reference_bfs(~walkable, 0, 0)[5, 0]
+
+    walkable[3, 4] = False
+    assert len(astar_grid(walkable, 0, 0, 5, 0, *scratch, 3)) == 0
@@ -0,0 +1,109 @@
+import pytest
+
+from game_message import Character, Constants, GameMap, Item, Position, TeamGameState, TileType
+from tick_context import TickContext, ENEMY_ZONE, NEUTRAL_ZONE, TEAM_ZONE, TILE_TEAM_OPEN
+
+WIDTH, HEIGHT = 6, 4
+
+
+@pytest.fixture(autouse=True)
+def fresh_context_caches():
+    """Every test starts as the first tick of a game"""
+    TickContext._current = None
+    TickContext._static_map = None
+    yield
+    TickContext._current = None
+    TickContext._static_map = None
+
+
+def make_tiles(walls=()):
+    return [[TileType.WALL if (x, y) in walls else TileType.EMPTY for y in range(HEIGHT)] for x in range(WIDTH)]
+
+
+def make_zone(team_columns=2, enemy_columns=2):
+    """Our zone on the left columns, the enemy's on the right ones, neutral in between"""
+    return [["A" if x < team_columns else "B" if x >= WIDTH - enemy_columns else "" for _ in range(HEIGHT)]
+            for x in range(WIDTH)]
+
+
+def make_state(tick=1, tiles=None, zone=None, items=(), enemies=((4, 1),)):
+    return TeamGameState(
+        type="TICK", tick=tick, currentTeamId="A", currentTickNumber=tick, lastTickErrors=[],
+        constants=Constants(respawnCooldownTicks=5, maxNumberOfItemsCarriedPerCharacter=3),
+        teamZoneGrid=zone if zone is not None else make_zone(),
+        yourCharacters=[Character(id="A0", teamId="A", position=Position(0, 0), alive=True,
+                                  carriedItems=[], numberOfCarriedItems=0)],
+        otherCharacters=[Character(id=f"B{i}", teamId="B", position=Position(x, y), alive=True,
+                                   carriedItems=[], numberOfCarriedItems=0) for i, (x, y) in enumerate(enemies)],
+        teamIds=["A", "B"],
+        map=GameMap(width=WIDTH, height=HEIGHT, tiles=tiles if tiles is not None else make_tiles()),
+        items=[Item(position=Position(x, y), type="blitzium_nugget", value=1) for x, y in items],
+        score={})
+
+
+def test_for_state_is_shared_within_a_tick():
+    state = make_state()
+    ctx = TickContext.for_state(state)
+    assert TickContext.for_state(state) is ctx
+    assert TickContext.for_state(make_state(tick=2)) is not ctx
+
+
+def test_zone_and_walls_are_decoded_by_x_then_y():
+    ctx = TickContext.for_state(make_state(tiles=make_tiles(walls={(1, 2)})))
+    assert ctx.walls.shape == (WIDTH, HEIGHT)
+    assert ctx.walls[1, 2] and ctx.walls.sum() == 1
+    assert ctx.zone[0, 0] == TEAM_ZONE and ctx.zone[2, 0] == NEUTRAL_ZONE and ctx.zone[5, 3] == ENEMY_ZONE
+    assert ctx.zone_buf[5 * HEIGHT + 3] == ENEMY_ZONE
+
+
+def test_layout_is_carried_over_while_walls_and_zones_are_unchanged():
+    first = TickContext.for_state(make_state(tick=1, items=[(0, 0)]))
+    depth, border = first.team_depth, first.team_border
+    second = TickContext.for_state(make_state(tick=2, items=[(1, 1)], enemies=[(3, 3)]))
+
+    # Equal tiles and zone lists from a new message: the grids and their derived fields are reused
+    assert second.walls is first.walls
+    assert second.zone is first.zone
+    assert second.team_depth is depth and second.team_border is border
+    # Per-tick state is still rebuilt
+    assert second.occupied[1, 1] and not second.occupied[0, 0]
+    assert second.enemy_risk[3, 3] == 1 and second.enemy_risk[5, 0] == 0 and first.enemy_risk[5, 0] == 1
+
+
+def test_layout_is_rebuilt_when_the_zone_changes():
+    first = TickContext.for_state(make_state(tick=1))
+    depth = first.team_depth
+    second = TickContext.for_state(make_state(tick=2, zone=make_zone(team_columns=3, enemy_columns=1)))
+
+    assert second.walls is first.walls
+    assert second.zone is not first.zone
+    assert second.zone[2, 0] == TEAM_ZONE and second.zone[4, 0] == NEUTRAL_ZONE
+    assert second.team_depth is not depth
+    assert second.team_depth[2, 0] == 1 and first.team_depth[2, 0] == 0
+
+
+def test_walls_and_layout_are_rebuilt_when_the_tiles_change():
+    first = TickContext.for_state(make_state(tick=1))
+    team_open = first.team_open
+    second = TickContext.for_state(make_state(tick=2, tiles=make_tiles(walls={(0, 1)})))
+
+    assert second.walls is not first.walls
+    assert second.walls[0, 1] and not first.walls[0, 1]
+    assert second.team_open is not team_open
+    assert team_open[0, 1] and not second.team_open[0, 1]
+    # The tile predicates see the new wall
+    assert not second.tile_flags[0 * HEIGHT + 1] & TILE_TEAM_OPEN
+
+
+def test_distance_fields_are_shared_within_a_tick_only():
+    state = make_state(tiles=make_tiles(walls={(1, 0), (1, 1), (1, 2)}))
+    ctx = TickContext.for_state(state)
+    from_origin = ctx.distances_from(0, 0)
+    assert ctx.distances_from(0, 0) is from_origin
+    assert from_origin[2, 0] == 8 and from_origin[1, 3] == 4
+
+    # Team paths stay in our columns 0 and 1, so (2, 0) has none
+    assert ctx.team_distances_from(0, 0)[0, 3] == 3
+    assert ctx.team_distances_from(0, 0)[2, 0] == -1
+
+    assert TickContext.for_state(make_state(tick=2, tiles=state.map.tiles)).distances_from(0, 0) is not from_origin
@@ -0,0 +1,279 @@
+from game_message import Item, TeamGameState
+from typing import List, Optional, Tuple
+from collections import defaultdict
+from functools import cached_property, lru_cache
+import numpy as np
+from kernels import border_depth, bfs_distances, team_layout
+
+# Zone codes used by TickContext.zone
+NEUTRAL_ZONE = 0
+TEAM_ZONE = 1
+ENEMY_ZONE = 2
+
+# Bits of TickContext.tile_flags
+TILE_WALL = 1
+TILE_TEAM = 2
+TILE_TEAM_OPEN = 4  # TILE_TEAM and not TILE_WALL
+TILE_ITEM = 8
+TILE_BORDER = 16
+
+# Bucket size of TickContext.enemy_grid, the largest radius Carrier.is_safe_position looks at
+ENEMY_CELL_SIZE = 3
+
+@lru_cache(maxsize=None)
+def item_kind(item_type: str) -> str:
+  """Classify an item type as "blitzium" or "radiant" (memoized, there are only a few types)"""
+  if item_type.startswith("blitzium_"):
+    return "blitzium"
+  if item_type.startswith("radiant_"):
+    return "radiant"
+  return ""
+
+class TickContext:
+  """Everything derived from the game state that is the same for all of our characters this tick"""
+  # Context of the last game state seen by for_state
+  _current: Optional["TickContext"] = None
+  # Walls never change during a game: (map.tiles they were built from, walls)
+  _static_map: Optional[Tuple[List[List[str]], np.ndarray]] = None
+  # Attributes and cached properties that depend on nothing but the walls and the zone grid
+  _LAYOUT_FIELDS = ('zone', 'zone_buf', 'enemy_cells', 'team_depth', '_team_layout', 'team_border',
+                    'team_open', 'patrol_score', 'patrol_tiles', 'team_border_tiles', 'open_border_tiles',
+                    'dist_to_team', 'team_blocked')
+
+  def __init__(self, game_state: TeamGameState):
+    self.game_state = game_state
+    self.tick = game_state.currentTickNumber
+    self.team_id = game_state.currentTeamId
+    self.team_zone = game_state.teamZoneGrid
+    self.map = game_state.map
+    self.height = self.map.height
+
+    self.walls = self._static_walls()
+    previous = TickContext._current
+    if (previous is not None and previous.walls is self.walls and previous.team_id == self.team_id and
+            previous.team_zone == self.team_zone):
+      # Same walls and zones as the previous tick: everything derived from them only is carried over
+      for field in self._LAYOUT_FIELDS:
+        if field in previous.__dict__:
+          self.__dict__[field] = previous.__dict__[field]
+    else:
+      self.zone = self._build_zone_grid()
+      # Same codes flattened to bytes, zone_buf[x * height + y], for the scalar lookups
+      self.zone_buf = self.zone.tobytes()
+      self.enemy_cells = np.nonzero(self.zone == ENEMY_ZONE)
+    # Scratch queue reused by every character's bfs_distances this tick
+    self.bfs_queue = np.empty(self.walls.size, dtype=np.int32)
+    # Distance fields by source tile, filled by distances_from and team_distances_from
+    self._distances = {}
+    self._team_distances = {}
+    # Manhattan distance from a tile to every team_border_tiles row, filled by border_distances_from
+    self._border_distances = {}
+
+    # Item occupancy grid, plus the same flattened to bytes for the scalar lookups
+    self.all_items = game_state.items
+    self.occupied = np.zeros(self.zone.shape, dtype=bool)
+    for item in self.all_items:
+      self.occupied[item.position.x, item.position.y] = True
+    self.occupied_buf = self.occupied.tobytes()
+
+    # Items as parallel arrays in all_items order, one pass over the objects
+    self.item_xs = np.array([item.position.x for item in self.all_items], dtype=np.intp)
+    self.item_ys = np.array([item.position.y for item in self.all_items], dtype=np.intp)
+    self.item_values = np.array([item.value for item in self.all_items], dtype=np.int32)
+    kinds = [item_kind(item.type) for item in self.all_items]
+
+    blitzium_idx = [i for i, kind in enumerate(kinds) if kind == "blitzium"]
+    self.blitzium: List[Item] = [self.all_items[i] for i in blitzium_idx]
+    self.blitzium_xs = self.item_xs[blitzium_idx]
+    self.blitzium_ys = self.item_ys[blitzium_idx]
+    self.blitzium_values = self.item_values[blitzium_idx]
+    self.blitzium_zones = self.zone[self.blitzium_xs, self.blitzium_ys]
+    radiant_idx = [i for i, kind in enumerate(kinds) if kind == "radiant"]
+    self.radiants: List[Item] = [self.all_items[i] for i in radiant_idx]
+    self.radiant_xs = self.item_xs[radiant_idx]
+    self.radiant_ys = self.item_ys[radiant_idx]
+    self.radiant_zones = self.zone[self.radiant_xs, self.radiant_ys]
+
+    self.enemies = game_state.otherCharacters
+    self.allies = game_state.yourCharacters
+    # Total value carried by each character, ours and theirs, summed once
+    self.carried_values = {character.id: sum(item.value for item in character.carriedItems)
+                           for characters in (self.allies, self.enemies) for character in characters}
+    # Enemies as parallel arrays in otherCharacters order
+    self.enemy_x = np.array([e.position.x for e in self.enemies], dtype=np.int32)
+    self.enemy_y = np.array([e.position.y for e in self.enemies], dtype=np.int32)
+    self.enemy_alive = np.array([e.alive for e in self.enemies], dtype=bool)
+    self.enemies_by_id = {e.id: e for e in self.enemies}
+    # The alive ones in the same order, filtered once for every character
+    self.live_enemies = [e for e in self.enemies if e.alive]
+    self.alive_enemy_ids = {e.id for e in self.live_enemies}
+    # Coordinates of the alive ones, as arrays and flat (x, y) for the distance loops
+    self.enemy_xs = self.enemy_x[self.enemy_alive]
+    self.enemy_ys = self.enemy_y[self.enemy_alive]
+    self.alive_enemies = list(zip(self.enemy_xs.tolist(), self.enemy_ys.tolist()))
+    # Alive enemies bucketed by ENEMY_CELL_SIZE x ENEMY_CELL_SIZE cells
+    self.enemy_grid = defaultdict(list)
+    for ex, ey in self.alive_enemies:
+      self.enemy_grid[(ex // ENEMY_CELL_SIZE, ey // ENEMY_CELL_SIZE)].append((ex, ey))
+
+  @classmethod
+  def for_state(cls, game_state: TeamGameState) -> "TickContext":
+    """Context of game_state, built on the first call of the tick and shared afterwards"""
+    if cls._current is None or cls._current.game_state is not game_state:
+      cls._current = cls(game_state)
+    return cls._current
+
+  def _static_walls(self) -> np.ndarray:
+    """Wall grid, rebuilt only when the tiles differ from the previous tick's"""
+    tiles = self.map.tiles
+    cached = TickContext._static_map
+    # A list comparison runs in C, much cheaper than building the grid tile by tile again
+    if cached is None or cached[0] != tiles:
+      walls = self._as_xy(np.array([[tile == "WALL" for tile in column] for column in tiles], dtype=bool))
+      cached = (tiles, walls)
+      TickContext._static_map = cached
+    return cached[1]
+
+  def _as_xy(self, grid: np.ndarray) -> np.ndarray:
+    """grid indexed [x, y]: the server sends columns first, a rows-first grid is transposed once here"""
+    width, height = self.map.width, self.map.height
+    if width != height and grid.shape == (height, width):
+      return np.ascontiguousarray(grid.T)
+    return grid
+
+  def _build_zone_grid(self) -> np.ndarray:
+    """Encode the team zone grid as int8 zone codes, indexed [x, y]"""
+    zone = np.full((self.map.width, self.map.height), NEUTRAL_ZONE, dtype=np.int8)
+    if zone.size:
+      # Compare each tile's team id string once, everything downstream uses the int codes
+      tz = self._as_xy(np.asarray(self.team_zone))
+      own = tz == self.team_id
+      zone[own] = TEAM_ZONE
+      zone[~own & (tz != "")] = ENEMY_ZONE
+    return zone
+
+  @cached_property
+  def team_depth(self) -> np.ndarray:
+    """How deep each tile is in our territory, from a multi-source BFS over every non-team tile"""
+    return border_depth(self.zone, TEAM_ZONE)
+
+  @cached_property
+  def _team_layout(self) -> Tuple[np.ndarray, np.ndarray]:
+    """team_border and the 5x5 team_open coverage of every tile, from one compiled pass over the grid"""
+    return team_layout(self.zone, self.walls, TEAM_ZONE)
+
+  @cached_property
+  def team_border(self) -> np.ndarray:
+    """Tiles of our zone next to a non-wall tile outside of it"""
+    return self._team_layout[0]
+
+  @cached_property
+  def team_open(self) -> np.ndarray:
+    """Tiles a defender may stand on: in our zone and not a wall"""
+    return ~self.walls & (self.zone == TEAM_ZONE)
+
+  @cached_property
+  def tile_flags(self) -> bytes:
+    """The TILE_* bits of every tile flattened like zone_buf, so a defender predicate is a single load and mask"""
+    ours = self.zone == TEAM_ZONE
+    flags = (self.walls * np.uint8(TILE_WALL) | ours * np.uint8(TILE_TEAM) | self.team_open * np.uint8(TILE_TEAM_OPEN) |
+             self.occupied * np.uint8(TILE_ITEM) | self.team_border * np.uint8(TILE_BORDER))
+    return flags.astype(np.uint8).tobytes()
+
+  @cached_property
+  def patrol_score(self) -> Optional[np.ndarray]:
+    """Patrol score shared by every defender: border bonus plus territory coverage, -inf off our open tiles"""
+    candidates = self.team_open
+    if not candidates.any():
+      return None
+
+    # Prefer border positions, then territory coverage: candidate tiles in the 5x5 square around each tile
+    return np.where(candidates, 10 * self.team_border + self._team_layout[1] * 0.5, -np.inf)
+
+  @cached_property
+  def patrol_tiles(self) -> Tuple[np.ndarray, np.ndarray]:
+    """Flat x * height + y indices of the tiles patrol_score allows, in x-major order, and their scores"""
+    flat_score = self.patrol_score.ravel()
+    tiles = np.flatnonzero(np.isfinite(flat_score))
+    return tiles, flat_score[tiles]
+
+  @cached_property
+  def team_border_tiles(self) -> np.ndarray:
+    """(x, y) rows of team_border, in x-major order"""
+    return np.argwhere(self.team_border)
+
+  @cached_property
+  def open_border_tiles(self) -> np.ndarray:
+    """(x, y) rows of the team_border tiles that are not walls, in x-major order"""
+    tiles = self.team_border_tiles
+    return tiles[self.team_open[tiles[:, 0], tiles[:, 1]]]
+
+  @cached_property
+  def team_negative_items(self) -> np.ndarray:
+    """Indices in all_items of the negative-value items lying in our zone, the ones defenders clean up"""
+    return np.flatnonzero((self.item_values < 0) & (self.zone[self.item_xs, self.item_ys] == TEAM_ZONE))
+
+  @cached_property
+  def drop_tiles(self) -> np.ndarray:
+    """(x, y) rows of the empty open tiles outside our zone next to an open tile of it, in x-major order"""
+    team_open = self.team_open
+    touches = np.zeros(team_open.shape, dtype=bool)
+    touches[:-1] |= team_open[1:]
+    touches[1:] |= team_open[:-1]
+    touches[:, :-1] |= team_open[:, 1:]
+    touches[:, 1:] |= team_open[:, :-1]
+    return np.argwhere(touches & ~self.walls & (self.zone != TEAM_ZONE) & ~self.occupied)
+
+  @cached_property
+  def dist_to_team(self) -> np.ndarray:
+    """Manhattan distance from every tile to the closest open tile of our zone (0 on them)"""
+    # border_depth seeds every tile whose code differs from 0, here exactly our non-wall tiles
+    return border_depth(self.team_open.astype(np.int8), 0)
+
+  @cached_property
+  def team_blocked(self) -> np.ndarray:
+    """Tiles a defender does not walk on: walls and everything outside our zone"""
+    return ~self.team_open
+
+  def distances_from(self, x: int, y: int) -> np.ndarray:
+    """Walking distance from (x, y) to every tile, -1 if unreachable (shared, do not modify)"""
+    distances = self._distances.get((x, y))
+    if distances is None:
+      distances = self._distances[(x, y)] = bfs_distances(self.walls, x, y, self.bfs_queue)
+    return distances
+
+  def team_distances_from(self, x: int, y: int) -> np.ndarray:
+    """Walking distance from (x, y) to every tile without leaving our zone, -1 if there is no such path"""
+    # The source itself may lie outside (a drop tile), the search then enters from its neighbours
+    distances = self._team_distances.get((x, y))
+    if distances is None:
+      distances = self._team_distances[(x, y)] = bfs_distances(self.team_blocked, x, y, self.bfs_queue)
+    return distances
+
+  def border_distances_from(self, x: int, y: int) -> np.ndarray:
+    """Manhattan distance from (x, y) to each row of team_border_tiles (shared, do not modify)"""
+    distances = self._border_distances.get((x, y))
+    if distances is None:
+      border = self.team_border_tiles
+      distances = self._border_distances[(x, y)] = np.abs(border[:, 0] - x) + np.abs(border[:, 1] - y)
+    return distances
+
+  @cached_property
+  def enemy_adjacent_buf(self) -> bytes:
+    """Tiles at Manhattan distance 1 or less of an alive enemy, flattened like zone_buf"""
+    adjacent = np.zeros(self.zone.shape, dtype=bool)
+    for ex, ey in self.alive_enemies:
+      adjacent[max(ex - 1, 0):ex + 2, ey] = True
+      adjacent[ex, max(ey - 1, 0):ey + 2] = True
+    return adjacent.tobytes()
+
+  @cached_property
+  def enemy_risk(self) -> np.ndarray:
+    """Number of alive enemies within Manhattan distance 3 of each tile"""
+    risk = np.zeros(self.zone.shape, dtype=np.int32)
+    xs = np.arange(risk.shape[0])[:, None]
+    ys = np.arange(risk.shape[1])[None, :]
+    # Stamp one diamond per enemy, bounded by the enemy count rather than tiles x enemies in Python
+    for ex, ey in self.alive_enemies:
+      risk += np.abs(xs - ex) + np.abs(ys - ey) <= 3
+    return risk